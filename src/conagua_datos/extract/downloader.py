@@ -2,12 +2,17 @@ import os
 import io
 import zipfile
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import shutil
 import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import IO, Dict, Tuple
 import pandas as pd
+import pyarrow as pa
 from unidecode import unidecode
 import tabula
 from src.conagua_datos.utils import PathUtils
@@ -31,9 +36,18 @@ month_map = {
     "diciembre": "dic"
 }
 
+# Formats accepted by _save_new_info / download_conagua
+OUTPUT_FORMATS = {"xlsx", "parquet"}
+
 logging.basicConfig(level=logging.INFO)
 
 
+def validate_output_format(output_format: str) -> None:
+    """Raises ValueError if output_format is not a supported format."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Invalid output format: {output_format}")
+
+
 class DownloadCONAGUA:
 
     def __init__(self) -> None:
@@ -45,13 +59,33 @@ class DownloadCONAGUA:
         self.temp_url = config_file["temp_url"]
         self.new_info_url = config_file['new_info_url']
         self.pronostic_url = config_file["pronostic_url"]
+        # Reuse connections to the CONAGUA hosts across every download.
+        self._session = requests.Session()
+        self._session.mount(
+            "https://",
+            HTTPAdapter(
+                pool_connections=16,
+                pool_maxsize=16,
+                max_retries=Retry(total=3, backoff_factor=0.3)
+            )
+        )
 
-    def read_pdf_table(self, url: str) -> pd.DataFrame:
-        """Reads the first table from the PDF at the given URL."""
-        df = tabula.read_pdf(url, pages=1, lattice=True)[0]
+    def _fetch_pdf(self, url: str) -> bytes:
+        """Downloads the PDF at the given URL and returns its content."""
+        response = self._session.get(url)
+        response.raise_for_status()
+        return response.content
+
+    def _parse_pdf_table(self, content: bytes) -> pd.DataFrame:
+        """Reads the first table from the given PDF content."""
+        df = tabula.read_pdf(io.BytesIO(content), pages=1, lattice=True)[0]
         df.columns = [col.strip().lower() for col in df.columns]
         return df
 
+    def read_pdf_table(self, url: str) -> pd.DataFrame:
+        """Reads the first table from the PDF at the given URL."""
+        return self._parse_pdf_table(self._fetch_pdf(url))
+
     def _get_datatype_config(self, data_type: str) -> Dict[str, str]:
         """
         Returns a configuration dictionary for the given data type.
@@ -80,13 +114,16 @@ class DownloadCONAGUA:
             raise ValueError(f"Invalid data type: {data_type}")
 
     def _get_datatype_values(
-        self, data_type: str = "precipitacion"
+        self,
+        data_type: str = "precipitacion",
+        include_new_info: bool = True
     ) -> Tuple[str, Dict[int, pd.DataFrame], str, str]:
         """
         Obtains the ZIP URL, new information dictionary, default folder name,
         and filename based on the data type.
         new_info_dict maps each year (from 2024 to current year) to the
-        corresponding DataFrame from its PDF.
+        corresponding DataFrame from its PDF. When include_new_info is False
+        the PDFs are not downloaded and new_info_dict is empty.
         """
         latest_year = datetime.now().year
         config = self._get_datatype_config(data_type)
@@ -94,23 +131,32 @@ class DownloadCONAGUA:
         default_folder = config["default_folder"]
         pdf_folder = config["pdf_folder"]
         filename = config["filename"]
+        if not include_new_info:
+            return zip_url, {}, default_folder, filename
 
-        new_info_dict = {
-            year: self.read_pdf_table(
-                f"{self.new_info_url}{pdf_folder}/{year}.pdf"
-            )
-            for year in range(2024, latest_year + 1)
-        }
+        # Download all the years concurrently, but parse them one at a time:
+        # tabula starts its JVM lazily without a lock, so concurrent first
+        # calls can race on the JVM startup.
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = {
+                year: executor.submit(
+                    self._fetch_pdf,
+                    f"{self.new_info_url}{pdf_folder}/{year}.pdf"
+                )
+                for year in range(2024, latest_year + 1)
+            }
+            new_info_dict = {
+                year: self._parse_pdf_table(future.result())
+                for year, future in futures.items()
+            }
         return zip_url, new_info_dict, default_folder, filename
 
     def set_destination_directory(
             self, file_location: str = None, default_folder: str = ""
-    ) -> Tuple[Path, Path]:
+    ) -> Path:
         """
         Determines the destination directory based on a provided file location
         or the default folder.
-        Returns a tuple of (destination directory, path for temporary ZIP
-        file).
         """
         if file_location is None:
             dest_dir = Path.cwd() / default_folder
@@ -118,58 +164,85 @@ class DownloadCONAGUA:
             dest_dir = Path(file_location)
         dest_dir.mkdir(parents=True, exist_ok=True)
         logging.info(f"Using destination directory: {dest_dir}")
-        zip_file_path = dest_dir / "temp.zip"
-        return dest_dir, zip_file_path
+        return dest_dir
 
-    def _download_zip_file(self, url: str, zip_file_path: Path) -> None:
+    def _download_zip_file(self, url: str) -> IO[bytes]:
         """
-        Downloads a ZIP file from the specified URL and writes it to
-        zip_file_path in chunks.
+        Downloads a ZIP file from the specified URL in chunks.
+        The archive is kept in memory and only spills to a temporary file on
+        disk when it grows beyond 256 MiB.
         """
         try:
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
+            with self._session.get(url, stream=True) as response:
+                response.raise_for_status()
+                zip_file = tempfile.SpooledTemporaryFile(max_size=256 << 20)
+                try:
+                    for chunk in response.iter_content(chunk_size=1 << 17):
+                        if chunk:  # Filter out keep-alive chunks
+                            zip_file.write(chunk)
+                except Exception:
+                    zip_file.close()
+                    raise
         except requests.RequestException as e:
             logging.error(f"Failed to download file: {e}")
             raise
+        zip_file.seek(0)
+        logging.info(f"Downloaded zip file: {url}")
+        return zip_file
 
-        with open(zip_file_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=1024):
-                if chunk:  # Filter out keep-alive chunks
-                    f.write(chunk)
-        logging.info(f"Downloaded zip file: {zip_file_path}")
-
-    def _extract_zip_file(self, zip_file_path: Path, dest_dir: Path) -> None:
+    def _extract_zip_file(self, zip_file: IO[bytes], dest_dir: Path) -> None:
         """
-        Extracts the contents of the ZIP file into the destination directory.
+        Extracts the contents of the ZIP file (a path or any seekable binary
+        file-like object) into the destination directory.
         If a common top-level folder exists, it is stripped from the
         extraction.
         """
         try:
-            with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
+            with zipfile.ZipFile(zip_file, "r") as zip_ref:
                 all_names = zip_ref.namelist()
                 common_prefix = os.path.commonprefix(all_names)
                 if common_prefix and not common_prefix.endswith('/'):
                     common_prefix = common_prefix.split('/')[0] + '/'
 
+                # Resolve every target path up front so the worker threads only
+                # copy bytes.
+                file_members = []
                 for member in zip_ref.infolist():
-                    member_name = member.filename
-                    if common_prefix and member_name.startswith(common_prefix):
-                        member_name = member_name[len(common_prefix):]
-                    target_path = dest_dir / member_name
+                    target_path = dest_dir / member.filename.removeprefix(
+                        common_prefix
+                    )
                     if member.is_dir():
                         target_path.mkdir(parents=True, exist_ok=True)
                     else:
                         target_path.parent.mkdir(parents=True, exist_ok=True)
-                        with zip_ref.open(member) as source, open(
-                            target_path, "wb"
-                        ) as target_file:
-                            shutil.copyfileobj(source, target_file)
+                        file_members.append((member, target_path))
+
+                # zipfile serializes the raw reads on the shared handle and
+                # releases the GIL while decompressing, so the members can be
+                # extracted concurrently.
+                workers = os.cpu_count()
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(
+                        lambda args: self._extract_member(zip_ref, *args),
+                        file_members
+                    ))
             logging.info(f"Extracted files into: {dest_dir}")
         except zipfile.BadZipFile as e:
             logging.error(f"Error extracting zip file: {e}")
             raise
 
+    def _extract_member(
+            self,
+            zip_ref: zipfile.ZipFile,
+            member: zipfile.ZipInfo,
+            target_path: Path
+    ) -> None:
+        """Writes a single ZIP member to target_path."""
+        with zip_ref.open(member) as source, open(
+            target_path, "wb"
+        ) as target_file:
+            shutil.copyfileobj(source, target_file, 1 << 17)
+
     def add_pronostico(
             self, new_info_dict: Dict[int, pd.DataFrame]
     ) -> Dict[int, pd.DataFrame]:
@@ -193,43 +266,75 @@ class DownloadCONAGUA:
             self,
             new_info_dict: Dict[int, pd.DataFrame],
             directory: Path,
-            filename: str
+            filename: str,
+            output_format: str = "xlsx"
     ) -> None:
         """
         Saves the new information DataFrames to the destination directory.
         Each file is saved as <year>_<filename>, e.g. '2025_Precip.xlsx'.
+        output_format is either "xlsx" (written with xlsxwriter) or "parquet"
+        (e.g. '2025_Precip.parquet'). A year whose table can't be stored as
+        parquet (e.g. text mixed into a numeric column) is saved as xlsx.
         """
+        validate_output_format(output_format)
         for key, df in new_info_dict.items():
-            full_path = directory / f"{key}{filename}"
-            df.to_excel(full_path, index=False)
+            xlsx_path = directory / f"{key}{filename}"
+            parquet_path = directory / f"{key}{Path(filename).stem}.parquet"
+            full_path, other_path = xlsx_path, parquet_path
+            if output_format == "parquet":
+                try:
+                    df.to_parquet(
+                        parquet_path, engine="pyarrow", compression="snappy"
+                    )
+                    full_path, other_path = parquet_path, xlsx_path
+                except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                    logging.error(
+                        f"Could not save {key} as parquet ({e}). "
+                        f"Saving it as xlsx instead."
+                    )
+                    parquet_path.unlink(missing_ok=True)
+            if full_path == xlsx_path:
+                df.to_excel(full_path, index=False, engine="xlsxwriter")
+            # Remove the year's file from a previous run in the other format
+            # so the processor doesn't ingest the year twice.
+            other_path.unlink(missing_ok=True)
             logging.info(f"Saved new info to: {full_path}")
 
     def download_conagua(
             self,
             file_location: str = None,
             data_type: str = "precipitacion",
-            include_pronostico: bool = True
+            include_pronostico: bool = True,
+            output_format: str = "xlsx",
+            include_new_info: bool = True
     ) -> None:
         """
         High-level method to download and extract CONAGUA data:
          - Determines the URL and new information based on data_type.
          - Sets the destination directory.
-         - Downloads the ZIP file.
+         - Downloads the ZIP file (in memory).
          - Extracts its contents.
          - Optionally, updates with pronostic data.
-         - Saves the new information in the destination folder.
+         - Saves the new information in the destination folder, as xlsx or
+           parquet depending on output_format.
+        The per-year PDFs (2024 onwards) are only downloaded when
+        include_new_info is True; the pronostic data is merged into them, so
+        it is skipped as well otherwise.
         """
-        dtype_vales = self._get_datatype_values(data_type)
+        validate_output_format(output_format)
+        dtype_vales = self._get_datatype_values(data_type, include_new_info)
         url, new_info_dict, default_folder, filename = dtype_vales
-        dest_dir, zip_file_path = self.set_destination_directory(
+        dest_dir = self.set_destination_directory(
             file_location, default_folder
         )
-        self._download_zip_file(url, zip_file_path)
-        self._extract_zip_file(zip_file_path, dest_dir)
-        if include_pronostico and (default_folder == "Precipitacion"):
-            new_info_dict = self.add_pronostico(new_info_dict)
-        self._save_new_info(new_info_dict, dest_dir, filename)
-        zip_file_path.unlink()  # Clean up the temporary ZIP file
+        with self._download_zip_file(url) as zip_file:
+            self._extract_zip_file(zip_file, dest_dir)
+        if new_info_dict:
+            if include_pronostico and (default_folder == "Precipitacion"):
+                new_info_dict = self.add_pronostico(new_info_dict)
+            self._save_new_info(
+                new_info_dict, dest_dir, filename, output_format
+            )
         self.directory = dest_dir
 
     def _generate_pronostic_url(
@@ -263,10 +368,21 @@ class DownloadCONAGUA:
         Returns a dictionary of DataFrames for CSV files located in the
         ESTADISTICAS folder.
         """
-        response = requests.get(url)
-        response.raise_for_status()
+        # Stream the body into a spooled buffer instead of holding it all in
+        # response.content; large archives spill to disk past 64 MiB.
+        with self._session.get(url, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            # Only allocate the buffer once the month is known to exist.
+            buffer = tempfile.SpooledTemporaryFile(max_size=64 << 20)
+            try:
+                shutil.copyfileobj(response.raw, buffer, 1 << 17)
+            except Exception:
+                buffer.close()
+                raise
+        buffer.seek(0)
         dataframes = {}
-        with zipfile.ZipFile(io.BytesIO(response.content)) as z:
+        with buffer, zipfile.ZipFile(buffer) as z:
             estadistica_files = [
                 f for f in z.namelist() if (
                     "ESTADISITCAS" in f.split("/")
@@ -308,9 +424,9 @@ class DownloadCONAGUA:
     ) -> Dict[str, pd.DataFrame]:
         """
         Attempts to download the pronostic ZIP for the current month.
-        If not available, it decrements the month (adjusting the year as
-        needed)
-        until a valid file is found or after a maximum number of attempts.
+        Availability is checked with a HEAD request first. If not available,
+        it decrements the month (adjusting the year as needed) until a valid
+        file is found or after a maximum number of attempts.
         """
         now = datetime.now()
         year = now.year
@@ -321,6 +437,12 @@ class DownloadCONAGUA:
             url = self._generate_pronostic_url(year, month, tipo)
             logging.info(f"Trying URL: {url}")
             try:
+                # Check the file exists before transferring the whole ZIP.
+                # Only client errors mean it is missing; a server that does
+                # not support HEAD (405/501) falls through to the GET.
+                head = self._session.head(url, allow_redirects=True)
+                if 400 <= head.status_code < 500 and head.status_code != 405:
+                    head.raise_for_status()
                 dfs = self.download_extract_pronostic(url)
                 logging.info(
                     f"Successfully downloaded pronostic for {month}/{year}"
@@ -1,6 +1,8 @@
 import pandas as pd
 from pathlib import Path
-from src.conagua_datos.extract.downloader import DownloadCONAGUA
+from src.conagua_datos.extract.downloader import (
+    DownloadCONAGUA, validate_output_format
+)
 from src.conagua_datos.transform.processor import DataProcessor
 from src.conagua_datos.transform import filter_data
 import logging
@@ -17,8 +19,11 @@ class ReadConaguaDatos:
             end_date: str,
             directory_path: str = None,
             data_type: str = "lluvia",
-            include_pronostico: bool = False
+            include_pronostico: bool = False,
+            include_new_info: bool = True,
+            output_format: str = "xlsx"
     ) -> None:
+        validate_output_format(output_format)
         logging.info(f"Downloading data for {data_type}")
         self.data_type = data_type
         self.start_date = start_date
@@ -28,12 +33,16 @@ class ReadConaguaDatos:
         self.processor = DataProcessor()
         self.data_filter = filter_data
         self.pronostico = include_pronostico
+        self.new_info = include_new_info
+        self.output_format = output_format
 
     def _read_conagua_datos(self) -> pd.DataFrame:
         # Download the data
         self.downloader.download_conagua(
             data_type=self.data_type,
-            include_pronostico=self.pronostico
+            include_pronostico=self.pronostico,
+            include_new_info=self.new_info,
+            output_format=self.output_format
         )
         logging.info(f"Download for {self.data_type} successful!")
         # Process the downloaded data
@@ -53,7 +62,7 @@ class ReadConaguaDatos:
             output_path = Path(file_location)
         else:
             output_path = Path.cwd() / "conagua_data.xlsx"
-        df.to_excel(output_path, index=False)
+        df.to_excel(output_path, index=False, engine="xlsxwriter")
 
     def get_conagua_csv(self, file_location: str = None) -> None:
         df = self._read_conagua_datos()
@@ -62,3 +71,13 @@ class ReadConaguaDatos:
         else:
             output_path = Path.cwd() / "conagua_data.csv"
         df.to_csv(output_path, index=False)
+
+    def get_conagua_parquet(self, file_location: str = None) -> None:
+        df = self._read_conagua_datos()
+        if file_location:
+            output_path = Path(file_location)
+        else:
+            output_path = Path.cwd() / "conagua_data.parquet"
+        df.to_parquet(
+            output_path, index=False, engine="pyarrow", compression="snappy"
+        )
@@ -9,11 +9,15 @@ def filtrar_datos(
     """
     df: pd.dataframe of temperature or rain.
     start_date / end_date: format "YYYY-mm-dd"
+    The result may share data with df (a slice of a sorted index, or df
+    itself when no dates are given); call .copy() on it before modifying it
+    if df must stay untouched.
     """
-    clima_df = df.copy()
-    # Ensure the index is a DatetimeIndex.
-    if not isinstance(clima_df.index, pd.DatetimeIndex):
-        clima_df.index = pd.to_datetime(clima_df.index)
+    # Ensure the index is a DatetimeIndex, without copying the frame.
+    if isinstance(df.index, pd.DatetimeIndex):
+        idx = df.index
+    else:
+        idx = pd.to_datetime(df.index)
 
     # Convert start and end dates to datetime objects, if provided.
     if start_date:
@@ -21,15 +25,29 @@ def filtrar_datos(
     if end_date:
         end_date = pd.to_datetime(end_date)
 
+    # A sorted index (as returned by process_data) can be sliced with a
+    # binary search instead of building a boolean mask.
+    if idx.is_monotonic_increasing:
+        selector = idx.slice_indexer(start_date or None, end_date or None)
+        clima_df = df.iloc[selector]
     # Apply the filtering based on provided dates.
-    if start_date and end_date:
-        return clima_df.loc[
-            (clima_df.index >= start_date) & (clima_df.index <= end_date)
-        ]
+    elif start_date and end_date:
+        selector = (idx >= start_date) & (idx <= end_date)
+        clima_df = df.loc[selector]
     elif start_date:
-        return clima_df.loc[clima_df.index >= start_date]
+        selector = idx >= start_date
+        clima_df = df.loc[selector]
     elif end_date:
-        return clima_df.loc[clima_df.index <= end_date]
+        selector = idx <= end_date
+        clima_df = df.loc[selector]
     else:
         # No filtering if no dates are provided.
-        return clima_df
+        if idx is df.index:
+            return df
+        return df.set_axis(idx)
+
+    # Keep the converted DatetimeIndex on the result; clima_df is already a
+    # new frame, so this does not touch the caller's df.
+    if idx is not df.index:
+        clima_df.index = idx[selector]
+    return clima_df
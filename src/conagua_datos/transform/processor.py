@@ -1,10 +1,42 @@
+import json
+import logging
 import pandas as pd
-from typing import Dict, List
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Dict, List, Optional
 import re
 from unidecode import unidecode
 from pathlib import Path
 from src.conagua_datos.utils import PathUtils
 
+# Spanish diacritics found in the state names, stripped in a single pass.
+ACCENT_TBL = str.maketrans("áéíóúÁÉÍÓÚñÑüÜ", "aeiouAEIOUnNuU")
+# Four-digit year embedded in the data file names.
+YEAR_RE = re.compile(r'\d{4}')
+# Snapshot of the cleaned data written next to the downloaded files.
+CACHE_FILENAME = "_cache.parquet"
+# Parquet metadata key holding the files (and mtimes) the cache was built from.
+CACHE_FILES_KEY = b"conagua_source_files"
+# Parquet metadata key holding the original column dtypes of the cached frame.
+CACHE_DTYPES_KEY = b"conagua_dtypes"
+
+
+def _read_data_file(path: Path, file: str) -> Optional[pd.DataFrame]:
+    """
+    Reads a single data file: parquet, or Excel (.xls or .xlsx) with the
+    native calamine engine. Returns None if the file can't be parsed.
+    """
+    try:
+        if file.endswith('.parquet'):
+            return pd.read_parquet(path)
+        return pd.read_excel(path, engine='calamine')
+    except ImportError:
+        # A missing reader engine is an environment problem, not a bad file.
+        raise
+    except Exception as e:
+        print(f"Error processing {file}: {e}")
+        return None
+
 
 class DataProcessor():
     def __init__(self):
@@ -19,18 +51,16 @@ class DataProcessor():
         Obtain dictionary of dataframes from the files in the working
         directory path.
         """
+        data_files = [
+            file for file in list_files
+            if file.endswith(('.xls', '.xlsx', '.parquet'))
+            and file != CACHE_FILENAME
+        ]
         dict_of_files = {}
-        for file in list_files:
-            path = working_directory_path.joinpath(file)
-            try:
-                if file.endswith('.xls'):
-                    dict_of_files[file] = pd.read_excel(path, engine='xlrd')
-                elif file.endswith('.xlsx'):
-                    dict_of_files[file] = pd.read_excel(
-                        path, engine='openpyxl'
-                    )
-            except Exception as e:
-                print(f"Error processing {file}: {e}")
+        for file in data_files:
+            df = _read_data_file(working_directory_path.joinpath(file), file)
+            if df is not None:
+                dict_of_files[file] = df
         return dict_of_files
 
     def _clean_data(
@@ -46,12 +76,14 @@ class DataProcessor():
         #     "ENTIDAD FEDERATIVA"
         # )
 
-        edge_case_rain = self.path_utils.load_config()["edge_case_rain"]
-        edge_case_temp = self.path_utils.load_config()["edge_case_temp"]
+        config = self.path_utils.load_config()
+        edge_case_rain = config["edge_case_rain"]
+        edge_case_temp = config["edge_case_temp"]
 
-        for year in climate_dict.keys():
-            lower_cols = climate_dict[year].columns.str.lower().str.strip()
-            year_int = int(re.search(r'\d{4}', year).group(0))
+        cleaned = []
+        for year, df in climate_dict.items():
+            lower_cols = df.columns.str.lower().str.strip()
+            year_int = int(YEAR_RE.search(year).group(0))
 
             # Edge case
             # if (
@@ -62,19 +94,13 @@ class DataProcessor():
             ) or (
                 edge_case_temp in lower_cols
             ):
-                climate_dict[year].columns = climate_dict[year].iloc[0]
-                climate_dict[year] = climate_dict[year].iloc[1:]
-                climate_dict[year].rename(
-                    columns={"ENTIDAD": 'estado'},
-                    inplace=True
-                )
-                climate_dict[year].reset_index(drop=True, inplace=True)
+                df.columns = df.iloc[0]
+                df = df.iloc[1:].rename(columns={"ENTIDAD": 'estado'})
+                df.reset_index(drop=True, inplace=True)
 
-            climate_dict[year] = self._make_cols_lower(climate_dict[year])
-            climate_dict[year] = self._make_info_lower(
-                climate_dict[year], ["estado"]
-            )
-            climate_dict[year].columns = climate_dict[year].columns.map({
+            df = self._make_cols_lower(df)
+            df = self._make_info_lower(df, ["estado"])
+            df.columns = df.columns.map({
                 "estado": "estado", "anual": "anual",
                 'ene': 1, 'feb': 2,
                 'mar': 3, 'abr': 4,
@@ -83,21 +109,35 @@ class DataProcessor():
                 'sep': 9, 'oct': 10,
                 'nov': 11, 'dic': 12
             })
-            climate_dict[year].drop(columns=["anual"], inplace=True)
-            climate_dict[year] = climate_dict[year][
-                climate_dict[year]["estado"] != "nacional"
-            ]
-            climate_dict[year] = climate_dict[year].T
-            climate_dict[year].columns = climate_dict[year].iloc[0]
-            climate_dict[year] = climate_dict[year].iloc[1:].reset_index(
-                names="month"
-            )
-            climate_dict[year]["year"] = year_int
-            # create date from month and year
-            climate_dict[year].index = pd.to_datetime(
-                climate_dict[year][['year', 'month']].assign(day=1)
-            )
-        return pd.concat(climate_dict.values()).rename_axis("date", axis=1)
+            # Trim rows and columns before reshaping so melt copies less.
+            # Blank and repeated estados are dropped as well, since pivot
+            # rejects duplicate entries.
+            df = df[
+                ~df["estado"].isin(["nacional", "nan", ""])
+            ].drop(columns=["anual"])
+            duplicated = df["estado"].duplicated()
+            if duplicated.any():
+                logging.warning(
+                    f"{year}: repeated estado rows dropped, keeping the first "
+                    f"of {sorted(df.loc[duplicated, 'estado'].unique())}"
+                )
+                df = df[~duplicated]
+            # Reshape to one row per month and one column per estado; unlike
+            # a transpose this keeps the values in their native dtype.
+            df = df.melt(
+                id_vars="estado", var_name="month", value_name="value"
+            ).pivot(
+                index="month", columns="estado", values="value"
+            ).reset_index()
+            df["year"] = year_int
+            cleaned.append(df)
+        # Assemble every year in a single concat instead of growing a frame.
+        combined = pd.concat(cleaned, copy=False)
+        # create date from month and year, in one pass over all the years
+        combined.index = pd.to_datetime(
+            combined[['year', 'month']].assign(day=1)
+        )
+        return combined.rename_axis("date", axis=1)
 
     def _make_info_lower(
         self,
@@ -105,8 +145,10 @@ class DataProcessor():
         columns: list[str]
     ) -> pd.DataFrame:
         for col in columns:
-            df[col] = df[col].apply(str).apply(
-                unidecode
+            # NFC first so decomposed accents become the single characters
+            # the translation table knows about.
+            df[col] = df[col].astype(str).str.normalize("NFC").str.translate(
+                ACCENT_TBL
             ).str.strip().str.lower()
         return df
 
@@ -116,19 +158,103 @@ class DataProcessor():
         ]
         return df
 
+    def _source_files_state(
+            self,
+            directory: Path,
+            files_list: List[str]
+    ) -> Dict[str, int]:
+        """
+        Maps every file in the directory (except the cache itself) to its
+        modification time in nanoseconds.
+        """
+        return {
+            file: directory.joinpath(file).stat().st_mtime_ns
+            for file in files_list if file != CACHE_FILENAME
+        }
+
+    def _load_cache(
+            self,
+            directory: Path,
+            files_list: List[str]
+    ) -> Optional[pd.DataFrame]:
+        """
+        Returns the cached cleaned data for the directory, or None if there is
+        no cache or the set of files (names and mtimes) it was built from no
+        longer matches the directory.
+        """
+        cache_path = directory / CACHE_FILENAME
+        if not cache_path.exists():
+            return None
+        try:
+            metadata = pq.read_schema(cache_path).metadata or {}
+            cached_files = json.loads(metadata.get(CACHE_FILES_KEY, b"null"))
+            if cached_files != self._source_files_state(
+                directory, files_list
+            ):
+                return None
+            df = pq.read_table(cache_path).to_pandas()
+            # Parquet infers native types (e.g. float64 for object columns of
+            # numbers); restore the dtypes the cleaned frame originally had.
+            dtypes = json.loads(metadata[CACHE_DTYPES_KEY])
+            return df.astype(dict(dtypes))
+        except (pa.ArrowException, OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable cache {cache_path}: {e}")
+            return None
+
+    def _save_cache(
+            self,
+            df: pd.DataFrame,
+            directory: Path,
+            files_list: List[str]
+    ) -> None:
+        """
+        Writes the cleaned data to the directory's cache, recording the files
+        it was built from in the parquet metadata.
+        """
+        try:
+            table = pa.Table.from_pandas(df)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            # e.g. text such as "S/D" mixed into a numeric column
+            logging.warning(f"Not caching {directory}: {e}")
+            return
+        files_state = self._source_files_state(directory, files_list)
+        dtypes = [[col, str(dtype)] for col, dtype in df.dtypes.items()]
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            CACHE_FILES_KEY: json.dumps(files_state).encode(),
+            CACHE_DTYPES_KEY: json.dumps(dtypes).encode()
+        })
+        pq.write_table(table, directory / CACHE_FILENAME)
+
     def process_data(
             self,
             directory: Path,
-            order_cols: bool = True
+            order_cols: bool = True,
+            use_cache: bool = False
     ) -> Dict[str, pd.DataFrame]:
+        """
+        Reads, cleans and sorts every data file in directory.
+        With use_cache, the cleaned frame is stored in <directory>/
+        _cache.parquet and reused while the directory's files are unchanged.
+        This only helps direct calls on an existing directory:
+        ReadConaguaDatos downloads (and so rewrites) the files before every
+        run, which always invalidates the cache.
+        """
         # Obtain files from directory
         files_list = self.path_utils.get_list_files_in_directory(directory)
-        # Create dictionary of files with pd df
-        df_dict = self.get_dataframes_files_path(
-            working_directory_path=directory, list_files=files_list
+        # Optionally reuse the cleaned snapshot from a previous run
+        process_df = (
+            self._load_cache(directory, files_list) if use_cache else None
         )
-        # clean data
-        process_df = self._clean_data(df_dict).sort_index()
+        if process_df is None:
+            # Create dictionary of files with pd df
+            df_dict = self.get_dataframes_files_path(
+                working_directory_path=directory, list_files=files_list
+            )
+            # clean data
+            process_df = self._clean_data(df_dict).sort_index()
+            if use_cache:
+                self._save_cache(process_df, directory, files_list)
         if order_cols:
             order_cols = self.path_utils.load_config()["order_col"]
             return process_df[order_cols]
@@ -1,9 +1,24 @@
+import copy
 import json
-import inspect
+import sys
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List
 
 
+@lru_cache(maxsize=None)
+def _load_config_for(caller_file: str) -> Dict:
+    """
+    Reads and parses the config.json next to caller_file. Results are cached
+    per module so each config file is only read once.
+    """
+    config_path = Path(caller_file).parent / "config.json"
+    if not config_path.exists():
+        raise FileNotFoundError(f"Config file {config_path} not found.")
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
 class PathUtils:
     def __init__(self):
         pass
@@ -16,13 +31,10 @@ class PathUtils:
         Loads the configuration from the config.json file located in the same
         directory as the calling module.
         """
-        # Get the caller's frame (one level up in the call stack)
-        caller_frame = inspect.stack()[1]
-        caller_module = inspect.getmodule(caller_frame[0])
-        # Build the config file path relative to the caller's module location.
-        caller_dir = Path(caller_module.__file__).parent
-        config_path = caller_dir / "config.json"
-        if not config_path.exists():
-            raise FileNotFoundError(f"Config file {config_path} not found.")
-        with open(config_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        # Get the caller's frame (one level up in the call stack) without
+        # materializing the whole stack.
+        caller_frame = sys._getframe(1)
+        # Hand out a copy so callers can't modify the cached config.
+        return copy.deepcopy(
+            _load_config_for(caller_frame.f_globals["__file__"])
+        )